@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from functools import cache
+from math import comb
+
+from gtraceroute.core.application.services import RouteHop
+from gtraceroute.core.transport.entities import ProbeReply, ProbeRequest
+from gtraceroute.core.transport.services import (
+    ICMPReplyWatcher,
+    ReplyWatcher,
+    RequestDispatcher,
+)
+from gtraceroute.core.utils import get_ipv4
+
+
+@cache
+def probes_needed(n_next_hops: int, confidence: float = 0.95) -> int:
+    # Multipath Detection Algorithm stopping rule: the number of flows that, were
+    # there n_next_hops + 1 equally loaded next hops, would have revealed all of
+    # them with the given confidence. Seeing only n_next_hops after that many
+    # flows lets us stop looking for more.
+    n_candidates = n_next_hops + 1
+    n_probes = n_candidates
+    while True:
+        # inclusion-exclusion over the next hops that no flow was hashed onto
+        p_missed_one = sum(
+            (-1) ** (j + 1)
+            * comb(n_candidates, j)
+            * ((n_candidates - j) / n_candidates) ** n_probes
+            for j in range(1, n_candidates)
+        )
+        if p_missed_one <= 1 - confidence:
+            return n_probes
+        n_probes += 1
+
+
+@dataclass
+class MultipathTopology:
+    target_ipv4: str
+    # ttl -> flow id -> responding interface, None if the probe timed out
+    responders: dict[int, dict[int, str | None]] = field(default_factory=lambda: {})
+    n_probes: int = 0
+
+    def interfaces(self, ttl: int) -> set[str]:
+        return {
+            ipv4 for ipv4 in self.responders.get(ttl, {}).values() if ipv4 is not None
+        }
+
+    @property
+    def links(self) -> set[tuple[int, str, str]]:
+        # the same flow id takes the same path, so consecutive responders are linked
+        links = set()
+        for ttl, flows in self.responders.items():
+            previous_flows = self.responders.get(ttl - 1, {})
+            for flow_id, ipv4 in flows.items():
+                previous_ipv4 = previous_flows.get(flow_id)
+                if ipv4 is not None and previous_ipv4 is not None:
+                    links.add((ttl, previous_ipv4, ipv4))
+        return links
+
+
+# Enumerates the load balanced paths towards a target with flow-stable probes,
+# only probing as many flows per ttl as needed to find all next hops.
+@dataclass
+class MultipathDiscoverer:
+    dispatcher: RequestDispatcher = field(default_factory=lambda: RequestDispatcher())
+    # room for a full batch of max_flows replies
+    reply_watcher: ReplyWatcher = field(
+        default_factory=lambda: ICMPReplyWatcher(buffer_size=256)
+    )
+    stop: asyncio.Event = field(default_factory=lambda: asyncio.Event())
+
+    async def probe_flow(
+        self, target_ipv4: str, ttl: int, flow_id: int, timeout: float
+    ) -> ProbeReply | None:
+        request = ProbeRequest(target_ipv4, ttl, flow_id=flow_id)
+        try:
+            async with asyncio.timeout(timeout):
+                await self.dispatcher.dispatch(request)
+                reply = None
+                while reply is None:
+                    await asyncio.sleep(0.05)
+                    reply = RouteHop.poll_for_matching_reply(
+                        request, self.reply_watcher
+                    )
+                return reply
+        except TimeoutError:
+            return None
+
+    async def discover(
+        self,
+        target_ipv4: str,
+        confidence: float = 0.95,
+        max_hops: int = 32,
+        max_flows: int = 128,
+        max_lost_flows: int = 3,
+        measurement_timeout: float = 1,
+        fetch_replies: bool = True,
+    ) -> MultipathTopology:
+        self.stop.clear()
+        if fetch_replies:
+            asyncio.create_task(self.reply_watcher.icmp_fetching(self.stop))
+
+        topology = MultipathTopology(target_ipv4)
+        try:
+            for ttl in range(1, max_hops + 1):
+                flows: dict[int, str | None] = {}
+                topology.responders[ttl] = flows
+                reached_target = False
+
+                # keep adding flows until the answered ones rule out another next hop.
+                # Lost flows are replaced, unless the ttl mostly does not answer.
+                while True:
+                    n_answered = sum(ipv4 is not None for ipv4 in flows.values())
+                    n_lost = len(flows) - n_answered
+                    n_needed = probes_needed(len(topology.interfaces(ttl)), confidence)
+                    if (
+                        n_answered >= n_needed
+                        or len(flows) >= max_flows
+                        or (n_lost >= max_lost_flows and n_lost > n_answered)
+                    ):
+                        break
+                    new_flow_ids = range(
+                        len(flows), min(max_flows, len(flows) + n_needed - n_answered)
+                    )
+                    replies = await asyncio.gather(
+                        *(
+                            self.probe_flow(
+                                target_ipv4, ttl, flow_id, measurement_timeout
+                            )
+                            for flow_id in new_flow_ids
+                        )
+                    )
+                    topology.n_probes += len(new_flow_ids)
+                    for flow_id, reply in zip(new_flow_ids, replies):
+                        flows[flow_id] = (
+                            reply.ipv4_header.source_ip if reply is not None else None
+                        )
+                        if reply is not None and (
+                            reply.icmp_header.type == 3
+                            or reply.ipv4_header.source_ip == target_ipv4
+                        ):
+                            reached_target = True
+
+                if reached_target and topology.interfaces(ttl) <= {target_ipv4}:
+                    break
+        finally:
+            if fetch_replies:
+                self.stop.set()
+
+        return topology
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog="gtraceroute-multipath",
+        description="Enumerate all load balanced paths towards a target.",
+    )
+    parser.add_argument("target", help="name or IP to trace")
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="probability of having found every next hop of a ttl",
+    )
+    parser.add_argument("--max-hops", type=int, default=32)
+    args = parser.parse_args()
+
+    target_ipv4 = get_ipv4(args.target)
+    topology = asyncio.run(
+        MultipathDiscoverer().discover(
+            target_ipv4, confidence=args.confidence, max_hops=args.max_hops
+        )
+    )
+    for ttl in topology.responders:
+        interfaces = sorted(topology.interfaces(ttl)) or ["*"]
+        print(f"#{ttl:<3} {', '.join(interfaces)}")
+    print(f"{len(topology.links)} links found with {topology.n_probes} probes.")
+
+
+if __name__ == "__main__":
+    run()
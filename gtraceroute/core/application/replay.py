@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque
+
+from gtraceroute.core.transport.capture import read_pcap
+from gtraceroute.core.transport.entities import ProbeReply, ProbeRequest
+from gtraceroute.core.utils import (
+    InvalidProbeReplyException,
+    InvalidProbeRequestException,
+)
+
+
+@dataclass
+class ReplayStats:
+    n_requests: int = 0
+    n_replies: int = 0
+    n_matched: int = 0
+    n_invalid: int = 0
+    elapsed: float = 0
+
+    @property
+    def replies_per_second(self) -> float:
+        return self.n_replies / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (
+            f"requests: {self.n_requests} | replies: {self.n_replies} "
+            f"(matched: {self.n_matched}) | invalid: {self.n_invalid} | "
+            f"{self.elapsed:.3f}s, {self.replies_per_second:.0f} replies/s"
+        )
+
+
+def match_reply(
+    reply: ProbeReply, pending_requests: Deque[ProbeRequest]
+) -> ProbeRequest | None:
+    for request in pending_requests:
+        if request.matches(reply):
+            pending_requests.remove(request)
+            return request
+    return None
+
+
+async def replay_capture(
+    capture_path: str, realtime: bool = False, measurement_timeout: float = 1
+) -> ReplayStats:
+    stats = ReplayStats()
+    pending_requests: Deque[ProbeRequest] = deque()
+
+    first_ts = None
+    start = time.perf_counter()
+    for ts, packet in read_pcap(capture_path):
+        if realtime:
+            first_ts = first_ts if first_ts is not None else ts
+            delay = (ts - first_ts) - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        # requests were captured as UDP packets, replies as ICMP packets
+        if len(packet) >= 20 and packet[9] == 17:
+            try:
+                pending_requests.append(ProbeRequest.from_bytes(packet, ts))
+            except InvalidProbeRequestException:
+                stats.n_invalid += 1
+                continue
+            stats.n_requests += 1
+            continue
+
+        try:
+            reply = ProbeReply.from_bytes(packet, ts)
+        except InvalidProbeReplyException:
+            stats.n_invalid += 1
+            continue
+        stats.n_replies += 1
+
+        # requests arrive in dispatch order, drop those that have timed out
+        while (
+            pending_requests
+            and reply.receive_ts - pending_requests[0].dispatch_ts > measurement_timeout
+        ):
+            pending_requests.popleft()
+
+        if match_reply(reply, pending_requests) is not None:
+            stats.n_matched += 1
+
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog="gtraceroute-replay",
+        description="Replay a capture recorded with `gtraceroute --capture`.",
+    )
+    parser.add_argument("capture", help="pcap file to replay")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="replay at the original speed instead of as fast as possible",
+    )
+    args = parser.parse_args()
+    print(asyncio.run(replay_capture(args.capture, realtime=args.realtime)))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,81 @@
+import argparse
+from dataclasses import dataclass
+from time import time
+
+from gtraceroute.core.application.services import RouteHop
+
+
+# Probes quiet hops less often, backing off up to `max_interval` between
+# measurements, and falls back to `min_interval` as soon as a hop gets noisy,
+# loses a probe or changes its route. `max_interval` bounds how long a loss can
+# go unnoticed.
+@dataclass
+class SamplingPolicy:
+    min_interval: float = 0
+    max_interval: float = 5
+    backoff: float = 2
+    backoff_start: float = 0.25
+    # a hop is noisy once its RTT deviation exceeds both of these
+    noisy_rtt_variation: float = 0.2
+    noisy_rtt_deviation_ms: float = 1
+    route_change_holdoff: float = 30
+
+    def is_noisy(self, hop: RouteHop) -> bool:
+        # hops that never answer, e.g. firewalled ones, have nothing to show.
+        # They are still probed every `max_interval` to notice when they do.
+        if not any(hop.recent_outcomes) or hop.rtt.exp_avg is None:
+            return False
+        if not all(hop.recent_outcomes):
+            return True
+        if (
+            hop.last_route_change_ts is not None
+            and time() - hop.last_route_change_ts < self.route_change_holdoff
+        ):
+            return True
+        if hop.rtt.exp_std is None:
+            return True
+        return hop.rtt.exp_std > max(
+            self.noisy_rtt_variation * hop.rtt.exp_avg, self.noisy_rtt_deviation_ms
+        )
+
+    def next_interval(self, hop: RouteHop) -> float:
+        if self.is_noisy(hop):
+            return self.min_interval
+        return min(
+            self.max_interval,
+            max(self.backoff_start, hop.probe_interval * self.backoff),
+        )
+
+
+def add_sampling_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="probe stable hops less often and unstable hops more often",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=SamplingPolicy.min_interval,
+        metavar="SECONDS",
+        help="with --adaptive, the pause between probes of noisy hops",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=SamplingPolicy.max_interval,
+        metavar="SECONDS",
+        help="with --adaptive, the longest pause between probes of quiet hops",
+    )
+
+
+def sampling_policy_from_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> SamplingPolicy | None:
+    if not args.adaptive:
+        return None
+    if not 0 <= args.min_interval <= args.max_interval:
+        parser.error("Expected 0 <= --min-interval <= --max-interval.")
+    return SamplingPolicy(
+        min_interval=args.min_interval, max_interval=args.max_interval
+    )
@@ -1,11 +1,86 @@
 import asyncio
+from collections import deque
 from dataclasses import dataclass, field
+from typing import Callable, Deque
 
 from gtraceroute.core.transport.entities import ProbeReply, ProbeRequest
-from gtraceroute.core.transport.services import ICMPReplyWatcher, RequestDispatcher
+from gtraceroute.core.transport.services import ReplyWatcher, RequestDispatcher
 from gtraceroute.core.utils import RTTMonitor
 
 
+@dataclass
+class RouteChangeEvent:
+    ts: float
+    target_ipv4: str
+    hop: int
+    previous_ipv4: str
+    new_ipv4: str
+    # the new responder was already seen recently, i.e. the route is flapping
+    is_flap: bool
+
+
+# The most recent responders of a single ttl and how often each of them occurs,
+# updated in constant time per reply.
+@dataclass
+class ResponderSet:
+    window: int = 20
+    current: str | None = None
+    counts: dict[str, int] = field(default_factory=lambda: {})
+    _recent: Deque[str] = field(default_factory=lambda: deque())
+
+    def observe(self, ipv4: str) -> tuple[str, bool] | None:
+        is_recent = ipv4 in self.counts
+        if len(self._recent) == self.window:
+            evicted = self._recent.popleft()
+            self.counts[evicted] -= 1
+            if self.counts[evicted] == 0:
+                del self.counts[evicted]
+        self._recent.append(ipv4)
+        self.counts[ipv4] = self.counts.get(ipv4, 0) + 1
+
+        previous, self.current = self.current, ipv4
+        if previous is None or previous == ipv4:
+            return None
+        return previous, is_recent
+
+
+# plain data summary of a RouteHop for handing it to other processes or clients
+@dataclass
+class HopSnapshot:
+    target_ipv4: str
+    hop: int
+    hop_ipv4: str | None
+    rtt_avg: float | None
+    rtt_std: float | None
+    time_last_ob: float | None
+    n_successful_measurements: int
+    n_failed_measurements: int
+    rtt_history: list[float] = field(default_factory=lambda: [])
+    probe_interval: float = 0
+    # number of RTTs observed so far, the history only holds the most recent ones
+    n_rtt_samples: int = 0
+
+    def to_route_hop(self) -> "RouteHop":
+        rtt = RTTMonitor(
+            buffer=deque(self.rtt_history, 100),
+            exp_avg=self.rtt_avg,
+            exp_std=self.rtt_std,
+            no_obs=self.time_last_ob is None,
+            time_last_ob=self.time_last_ob,
+            n_obs=self.n_rtt_samples,
+        )
+        return RouteHop(
+            self.target_ipv4,
+            self.hop,
+            asyncio.Event(),
+            self.n_successful_measurements,
+            self.n_failed_measurements,
+            self.hop_ipv4,
+            rtt,
+            probe_interval=self.probe_interval,
+        )
+
+
 @dataclass
 class RouteHop:
     target_ipv4: str
@@ -17,6 +92,16 @@ class RouteHop:
 
     hop_ipv4: str | None = None
     rtt: RTTMonitor = field(default_factory=lambda: RTTMonitor())
+    flow_id: int | None = None
+    responders: ResponderSet = field(default_factory=lambda: ResponderSet())
+    # each responder keeps its own statistics, `rtt` is the one of `hop_ipv4`
+    rtt_by_responder: dict[str, RTTMonitor] = field(default_factory=lambda: {})
+    on_route_change: Callable[[RouteChangeEvent], None] | None = None
+    last_route_change_ts: float | None = None
+    # whether each of the most recent measurements got a reply
+    recent_outcomes: Deque[bool] = field(default_factory=lambda: deque([], maxlen=10))
+    # pause between measurements, see SamplingPolicy
+    probe_interval: float = 0
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, RouteHop):
@@ -27,13 +112,58 @@ class RouteHop:
             and self.rtt.exp_avg == other.rtt.exp_avg
         )
 
+    def snapshot(self, with_rtt_history: bool = False) -> HopSnapshot:
+        # the history is only needed by clients that draw it
+        return HopSnapshot(
+            self.target_ipv4,
+            self.hop,
+            self.hop_ipv4,
+            self.rtt.exp_avg,
+            self.rtt.exp_std,
+            self.rtt.time_last_ob,
+            self.n_successful_measurements,
+            self.n_failed_measurements,
+            list(self.rtt.buffer) if with_rtt_history else [],
+            self.probe_interval,
+            self.rtt.n_obs,
+        )
+
+    def update_responder(self, responder_ipv4: str, ts: float):
+        change = self.responders.observe(responder_ipv4)
+        if self.hop_ipv4 is None:
+            self.rtt_by_responder[responder_ipv4] = self.rtt
+        elif responder_ipv4 != self.hop_ipv4:
+            # forget responders that have not been seen for a while
+            for ipv4 in list(self.rtt_by_responder):
+                if ipv4 not in self.responders.counts:
+                    del self.rtt_by_responder[ipv4]
+            self.rtt = self.rtt_by_responder.setdefault(responder_ipv4, RTTMonitor())
+        self.hop_ipv4 = responder_ipv4
+
+        if change is None:
+            return
+        self.last_route_change_ts = ts
+        if self.on_route_change is not None:
+            previous_ipv4, is_flap = change
+            self.on_route_change(
+                RouteChangeEvent(
+                    ts,
+                    self.target_ipv4,
+                    self.hop,
+                    previous_ipv4,
+                    responder_ipv4,
+                    is_flap,
+                )
+            )
+
     def update_rtt_estimates(self, request: ProbeRequest, reply: ProbeReply):
+        self.update_responder(reply.ipv4_header.source_ip, reply.receive_ts)
         rtt = reply.receive_ts - request.dispatch_ts
         self.rtt.observe(1000 * rtt)
-        self.hop_ipv4 = reply.ipv4_header.source_ip
 
+    @staticmethod
     def poll_for_matching_reply(
-        self, request: ProbeRequest, reply_watcher: ICMPReplyWatcher
+        request: ProbeRequest, reply_watcher: ReplyWatcher
     ) -> ProbeReply | None:
         match = None
         for reply in reply_watcher.reply_buffer:
@@ -50,12 +180,14 @@ class RouteHop:
     async def measure(
         self,
         dispatcher: RequestDispatcher,
-        reply_watcher: ICMPReplyWatcher,
+        reply_watcher: ReplyWatcher,
         timeout: float = 1,
     ):
         try:
             async with asyncio.timeout(timeout):
-                request = ProbeRequest(ipv4=self.target_ipv4, ttl=self.hop)
+                request = ProbeRequest(
+                    ipv4=self.target_ipv4, ttl=self.hop, flow_id=self.flow_id
+                )
                 await dispatcher.dispatch(request)
 
                 reply = None
@@ -64,6 +196,7 @@ class RouteHop:
                     await asyncio.sleep(0.25)
 
                 self.update_rtt_estimates(request, reply)
+                self.recent_outcomes.append(True)
 
                 if not self._found_all_hops.is_set() and (
                     reply.icmp_header.type == 3
@@ -72,4 +205,5 @@ class RouteHop:
                     self._found_all_hops.set()
         except TimeoutError:
             self.n_failed_measurements += 1
+            self.recent_outcomes.append(False)
         self.n_successful_measurements += 1
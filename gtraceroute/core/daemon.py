@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+import tempfile
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Deque
+
+from gtraceroute.core.application.sampling import SamplingPolicy
+from gtraceroute.core.application.services import (
+    HopSnapshot,
+    RouteChangeEvent,
+    RouteHop,
+)
+from gtraceroute.core.tracer import Tracer
+from gtraceroute.core.transport.services import ICMPReplyWatcher, RequestDispatcher
+from gtraceroute.core.utils import (
+    DaemonAlreadyRunningException,
+    InvalidAddressException,
+    await_or_cancel_on_event,
+    is_ipv4_address,
+)
+
+# per user, whoever can connect can make the daemon probe arbitrary hosts
+DEFAULT_DAEMON_SOCKET = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir()),
+    f"gtraceroute-{os.getuid()}.sock",
+)
+
+# clients that fall this far behind on reading their updates get disconnected
+MAX_CLIENT_BACKLOG_BYTES = 1024 * 1024
+
+
+async def is_daemon_running(socket_path: str) -> bool:
+    try:
+        _, writer = await asyncio.open_unix_connection(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return False
+    writer.close()
+    return True
+
+
+def send_message(writer: asyncio.StreamWriter, message: dict[str, Any]):
+    writer.write(json.dumps(message).encode() + b"\n")
+
+
+def with_new_rtt_samples(hop: HopSnapshot, sent_hop: HopSnapshot | None) -> HopSnapshot:
+    # clients keep their own history, so only send what they have not seen yet.
+    # A new responder comes with its own history, which replaces the client's.
+    if sent_hop is None or sent_hop.hop_ipv4 != hop.hop_ipv4:
+        return hop
+    n_new = max(0, hop.n_rtt_samples - sent_hop.n_rtt_samples)
+    return replace(
+        hop, rtt_history=hop.rtt_history[max(0, len(hop.rtt_history) - n_new) :]
+    )
+
+
+@dataclass
+class Subscription:
+    tracer: Tracer
+    clients: set[asyncio.StreamWriter] = field(default_factory=lambda: set())
+    sent_hops: dict[int, HopSnapshot] = field(default_factory=lambda: {})
+
+
+# Owns one dispatcher and reply watcher and probes every subscribed target exactly
+# once, however many clients watch it. Clients talk newline delimited JSON:
+#   -> {"subscribe": "1.2.3.4"} / {"unsubscribe": "1.2.3.4"}
+#   <- {"target_ipv4": "1.2.3.4", "hops": [changed hops], "removed": [hop numbers]}
+#      where each hop's "rtt_history" only holds the RTTs added since its last update
+#   <- {"target_ipv4": "1.2.3.4", "route_change": {...}} as soon as a route changes
+@dataclass
+class TraceDaemon:
+    socket_path: str = DEFAULT_DAEMON_SOCKET
+    update_interval: float = 0.3
+    measurement_timeout: float = 1
+    ttl_increment_delay: float = 0.5
+    flow_id: int | None = None
+    sampling_policy: SamplingPolicy | None = None
+    dispatcher: RequestDispatcher = field(default_factory=lambda: RequestDispatcher())
+    reply_watcher: ICMPReplyWatcher = field(
+        default_factory=lambda: ICMPReplyWatcher(buffer_size=1000)
+    )
+    stop: asyncio.Event = field(default_factory=lambda: asyncio.Event())
+    _subscriptions: dict[str, Subscription] = field(default_factory=lambda: {})
+
+    def subscribe(self, target_ipv4: str, writer: asyncio.StreamWriter):
+        subscription = self._subscriptions.get(target_ipv4)
+        if subscription is None:
+            subscription = Subscription(
+                Tracer(
+                    self.dispatcher,
+                    self.reply_watcher,
+                    on_route_change=self.publish_route_change,
+                    sampling_policy=self.sampling_policy,
+                )
+            )
+            self._subscriptions[target_ipv4] = subscription
+            asyncio.create_task(
+                subscription.tracer.trace_route(
+                    target_ipv4,
+                    measurement_timeout=self.measurement_timeout,
+                    ttl_increment_delay=self.ttl_increment_delay,
+                    fetch_replies=False,
+                    flow_id=self.flow_id,
+                )
+            )
+
+        subscription.clients.add(writer)
+        # late subscribers start from the current state, then get the same updates
+        send_message(
+            writer,
+            {
+                "target_ipv4": target_ipv4,
+                "hops": [asdict(hop) for hop in subscription.sent_hops.values()],
+                "removed": [],
+            },
+        )
+
+    def unsubscribe(self, target_ipv4: str, writer: asyncio.StreamWriter):
+        subscription = self._subscriptions.get(target_ipv4)
+        if subscription is None:
+            return
+        subscription.clients.discard(writer)
+        if not subscription.clients:
+            subscription.tracer.stop.set()
+            del self._subscriptions[target_ipv4]
+
+    def publish_route_change(self, event: RouteChangeEvent):
+        subscription = self._subscriptions.get(event.target_ipv4)
+        if subscription is None:
+            return
+        message = {"target_ipv4": event.target_ipv4, "route_change": asdict(event)}
+        for writer in subscription.clients:
+            send_message(writer, message)
+
+    def publish_updates(self):
+        for target_ipv4, subscription in self._subscriptions.items():
+            hops = {
+                hop.hop: hop.snapshot(with_rtt_history=True)
+                for hop in subscription.tracer.hops
+            }
+            changed = [
+                with_new_rtt_samples(hop, subscription.sent_hops.get(hop_number))
+                for hop_number, hop in hops.items()
+                if subscription.sent_hops.get(hop_number) != hop
+            ]
+            removed = [
+                hop_number
+                for hop_number in subscription.sent_hops
+                if hop_number not in hops
+            ]
+            if not changed and not removed:
+                continue
+            subscription.sent_hops = hops
+
+            message = {
+                "target_ipv4": target_ipv4,
+                "hops": [asdict(hop) for hop in changed],
+                "removed": removed,
+            }
+            for writer in list(subscription.clients):
+                if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG_BYTES:
+                    subscription.clients.discard(writer)
+                    writer.close()
+                    continue
+                send_message(writer, message)
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        targets: set[str] = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    message = None
+                if not isinstance(message, dict):
+                    send_message(writer, {"error": "Messages must be JSON objects."})
+                    continue
+
+                if target_ipv4 := message.get("subscribe"):
+                    if not (
+                        isinstance(target_ipv4, str) and is_ipv4_address(target_ipv4)
+                    ):
+                        send_message(writer, {"error": f"Invalid {target_ipv4=}."})
+                        continue
+                    targets.add(target_ipv4)
+                    self.subscribe(target_ipv4, writer)
+                elif isinstance(target_ipv4 := message.get("unsubscribe"), str):
+                    targets.discard(target_ipv4)
+                    self.unsubscribe(target_ipv4, writer)
+        except ConnectionError:
+            pass
+        finally:
+            for target_ipv4 in targets:
+                self.unsubscribe(target_ipv4, writer)
+            writer.close()
+
+    async def serve(self):
+        if await is_daemon_running(self.socket_path):
+            raise DaemonAlreadyRunningException(
+                f"A daemon is already listening on {self.socket_path}."
+            )
+        # a previous daemon that was killed leaves its socket file behind
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self.stop.clear()
+        # only the owner may connect, the socket must never exist more permissive
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self.handle_client, self.socket_path
+            )
+        finally:
+            os.umask(umask)
+        socket_inode = os.stat(self.socket_path).st_ino
+        asyncio.create_task(self.reply_watcher.icmp_fetching(self.stop))
+        try:
+            async with server:
+                while not self.stop.is_set():
+                    await asyncio.sleep(self.update_interval)
+                    self.publish_updates()
+        finally:
+            for subscription in self._subscriptions.values():
+                subscription.tracer.stop.set()
+                for writer in subscription.clients:
+                    writer.close()
+            self._subscriptions = {}
+            self.stop.set()
+            # do not remove a socket that has since been replaced by someone else
+            if (
+                os.path.exists(self.socket_path)
+                and os.stat(self.socket_path).st_ino == socket_inode
+            ):
+                os.unlink(self.socket_path)
+
+
+# Client side of TraceDaemon that stands in for a Tracer, e.g. in the TUI.
+# Probing parameters are the daemon's, the client only picks the target.
+@dataclass
+class RemoteTracer:
+    socket_path: str = DEFAULT_DAEMON_SOCKET
+    stop: asyncio.Event = field(default_factory=lambda: asyncio.Event())
+    _hops: dict[int, RouteHop] = field(default_factory=lambda: {})
+    route_changes: Deque[RouteChangeEvent] = field(
+        default_factory=lambda: deque([], maxlen=1000)
+    )
+
+    @property
+    def hops(self) -> list[RouteHop]:
+        return [self._hops[hop_number] for hop_number in sorted(self._hops)]
+
+    def apply_update(self, message: dict[str, Any]):
+        if "error" in message:
+            raise InvalidAddressException(message["error"])
+        if "route_change" in message:
+            self.route_changes.append(RouteChangeEvent(**message["route_change"]))
+            return
+        for hop_number in message["removed"]:
+            self._hops.pop(hop_number, None)
+        for hop in message["hops"]:
+            snapshot = HopSnapshot(**hop)
+            route_hop = snapshot.to_route_hop()
+            previous = self._hops.get(snapshot.hop)
+            if previous is not None and previous.hop_ipv4 == snapshot.hop_ipv4:
+                previous.rtt.buffer.extend(snapshot.rtt_history)
+                route_hop.rtt.buffer = previous.rtt.buffer
+            self._hops[snapshot.hop] = route_hop
+
+    async def receive_updates(self, reader: asyncio.StreamReader):
+        while line := await reader.readline():
+            self.apply_update(json.loads(line))
+
+    async def trace_route(self, target_ipv4: str) -> asyncio.Event:
+        self._hops = {}
+        self.route_changes.clear()
+        self.stop.clear()
+
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            send_message(writer, {"subscribe": target_ipv4})
+            await writer.drain()
+
+            result = await await_or_cancel_on_event(
+                self.receive_updates(reader), self.stop
+            )
+            # surfaces errors sent by the daemon
+            if isinstance(result, Exception):
+                raise result
+        finally:
+            self.stop.set()
+            writer.close()
+        return self.stop
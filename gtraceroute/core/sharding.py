@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event as ProcessEvent
+from typing import Deque
+
+from gtraceroute.core.application.sampling import (
+    SamplingPolicy,
+    add_sampling_arguments,
+    sampling_policy_from_args,
+)
+from gtraceroute.core.application.services import HopSnapshot, RouteChangeEvent
+from gtraceroute.core.tracer import Tracer
+from gtraceroute.core.transport.entities import PROBE_REPLY_RECORD, ProbeReply
+from gtraceroute.core.transport.ring_buffer import SharedRingBuffer
+from gtraceroute.core.transport.services import (
+    RequestDispatcher,
+    SharedReplyWatcher,
+    open_icmp_socket,
+)
+from gtraceroute.core.utils import (
+    InvalidProbeReplyException,
+    ShardProcessException,
+    get_ipv4,
+)
+
+# per target, the same share of the reply buffer a single Tracer gets
+REPLY_BUFFER_SIZE_PER_TARGET = 100
+
+# target, its current hops and the route changes since the previous report
+ShardReport = tuple[str, list[HopSnapshot], list[RouteChangeEvent]]
+
+
+def receive_replies(
+    icmp_socket: socket.socket,
+    rings: list[SharedRingBuffer],
+    shard_by_target: dict[str, int],
+    stop: ProcessEvent,
+):
+    # every raw ICMP socket sees every reply, so only this process reads one and
+    # each reply is parsed exactly once before being routed to its target's shard
+    icmp_socket.settimeout(0.1)
+    while not stop.is_set():
+        try:
+            probe_bytes = icmp_socket.recv(1024)
+        except TimeoutError:
+            continue
+        receive_ts = time.time()
+
+        try:
+            reply = ProbeReply.from_bytes(probe_bytes, receive_ts)
+        except InvalidProbeReplyException:
+            continue
+
+        shard = shard_by_target.get(reply.ref_ipv4_header.dst_ip)
+        if shard is not None:
+            rings[shard].put(reply.to_record())
+
+
+async def trace_shard(
+    targets: list[str],
+    ring: SharedRingBuffer,
+    stats_queue: "multiprocessing.Queue[ShardReport]",
+    stop: ProcessEvent,
+    max_hops: int,
+    measurement_timeout: float,
+    ttl_increment_delay: float,
+    report_interval: float,
+    sampling_policy: SamplingPolicy | None,
+):
+    dispatcher = RequestDispatcher()
+    reply_watcher = SharedReplyWatcher(
+        ring, buffer_size=REPLY_BUFFER_SIZE_PER_TARGET * len(targets)
+    )
+    stop_fetching = asyncio.Event()
+    asyncio.create_task(reply_watcher.icmp_fetching(stop_fetching))
+
+    tracers = {
+        target_ipv4: Tracer(dispatcher, reply_watcher, sampling_policy=sampling_policy)
+        for target_ipv4 in targets
+    }
+    for target_ipv4, tracer in tracers.items():
+        asyncio.create_task(
+            tracer.trace_route(
+                target_ipv4,
+                max_hops=max_hops,
+                return_early=True,
+                measurement_timeout=measurement_timeout,
+                ttl_increment_delay=ttl_increment_delay,
+                fetch_replies=False,
+            )
+        )
+
+    while not stop.is_set():
+        await asyncio.sleep(report_interval)
+        for target_ipv4, tracer in tracers.items():
+            route_changes = list(tracer.route_changes)
+            tracer.route_changes.clear()
+            stats_queue.put(
+                (target_ipv4, [hop.snapshot() for hop in tracer.hops], route_changes)
+            )
+
+    for tracer in tracers.values():
+        tracer.stop.set()
+    stop_fetching.set()
+
+
+def run_shard(*args):
+    asyncio.run(trace_shard(*args))
+
+
+# Traces many targets at once by splitting them across worker processes, each
+# running its own Tracers. A single receiver process owns the raw ICMP socket.
+@dataclass
+class ShardedTracer:
+    n_workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    ring_capacity: int = 4096
+    report_interval: float = 0.5
+    sampling_policy: SamplingPolicy | None = None
+    hops: dict[str, list[HopSnapshot]] = field(default_factory=lambda: {})
+    # replies the receiver had to drop because a shard fell behind
+    n_dropped_replies: int = 0
+    route_changes: Deque[RouteChangeEvent] = field(
+        default_factory=lambda: deque([], maxlen=1000)
+    )
+    _stop: ProcessEvent = field(default_factory=lambda: multiprocessing.Event())
+    _stats_queue: "multiprocessing.Queue[ShardReport]" = field(
+        default_factory=lambda: multiprocessing.Queue()
+    )
+    _rings: list[SharedRingBuffer] = field(default_factory=lambda: [])
+    _processes: list[BaseProcess] = field(default_factory=lambda: [])
+
+    def start(
+        self,
+        targets: list[str],
+        max_hops: int = 32,
+        measurement_timeout: float = 1,
+        ttl_increment_delay: float = 0.5,
+    ):
+        # fail in the caller, not in the receiver, if we may not open the socket
+        icmp_socket = open_icmp_socket()
+
+        # a target traced by two shards would only get replies in one of them
+        targets = list(dict.fromkeys(targets))
+        n_shards = max(1, min(self.n_workers, len(targets)))
+        shards = [targets[shard::n_shards] for shard in range(n_shards)]
+        shard_by_target = {
+            target_ipv4: shard
+            for shard, shard_targets in enumerate(shards)
+            for target_ipv4 in shard_targets
+        }
+        self._rings = [
+            SharedRingBuffer(self.ring_capacity, PROBE_REPLY_RECORD.size)
+            for _ in shards
+        ]
+
+        self._stop.clear()
+        self._processes = [
+            multiprocessing.Process(
+                target=receive_replies,
+                args=(icmp_socket, self._rings, shard_by_target, self._stop),
+                name="gtraceroute-receiver",
+                daemon=True,
+            )
+        ]
+        for shard, (shard_targets, ring) in enumerate(zip(shards, self._rings)):
+            self._processes.append(
+                multiprocessing.Process(
+                    target=run_shard,
+                    args=(
+                        shard_targets,
+                        ring,
+                        self._stats_queue,
+                        self._stop,
+                        max_hops,
+                        measurement_timeout,
+                        ttl_increment_delay,
+                        self.report_interval,
+                        self.sampling_policy,
+                    ),
+                    name=f"gtraceroute-shard-{shard}",
+                    daemon=True,
+                )
+            )
+        for process in self._processes:
+            process.start()
+        icmp_socket.close()
+
+    def poll(self) -> dict[str, list[HopSnapshot]]:
+        # without the receiver every shard would silently report 100% loss
+        if not self._stop.is_set():
+            for process in self._processes:
+                if not process.is_alive():
+                    raise ShardProcessException(
+                        f"{process.name} exited unexpectedly with {process.exitcode=}."
+                    )
+
+        while True:
+            try:
+                target_ipv4, hops, route_changes = self._stats_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.hops[target_ipv4] = hops
+            self.route_changes.extend(route_changes)
+        if self._rings:
+            self.n_dropped_replies = sum(ring.n_dropped for ring in self._rings)
+        return self.hops
+
+    def stop(self):
+        self._stop.set()
+        for process in self._processes:
+            # workers only exit once their queued stats have been picked up
+            while process.is_alive():
+                self.poll()
+                process.join(0.1)
+        for ring in self._rings:
+            ring.close()
+            ring.unlink()
+        self._processes = []
+        self._rings = []
+
+
+def format_hop(hop: HopSnapshot) -> str:
+    avg_rtt = hop.rtt_avg or float("inf")
+    std_rtt = hop.rtt_std or 0
+    n_measurements = hop.n_failed_measurements + hop.n_successful_measurements
+    packet_loss = 100 * hop.n_failed_measurements / max(1, n_measurements)
+    first_col = f"#{hop.hop}@{hop.hop_ipv4 or 'xxx.xxx.xxx.xxx':<15}"
+    return (
+        f"{first_col:>19} | RTT: {avg_rtt:.2f}ms +/- {std_rtt:.2f} | "
+        f"Loss: {packet_loss:.2f}%"
+    )
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog="gtraceroute-sharded",
+        description="Trace many targets at once across all cores, without the TUI.",
+    )
+    parser.add_argument("targets", nargs="+", help="names or IPs to trace")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--interval", type=float, default=2, help="seconds between reports"
+    )
+    add_sampling_arguments(parser)
+    args = parser.parse_args()
+
+    tracer = ShardedTracer(
+        n_workers=args.workers,
+        sampling_policy=sampling_policy_from_args(parser, args),
+    )
+    tracer.start([get_ipv4(target) for target in args.targets])
+    try:
+        while True:
+            time.sleep(args.interval)
+            for target_ipv4, hops in tracer.poll().items():
+                print(f"{target_ipv4}:")
+                for hop in hops:
+                    print(format_hop(hop))
+            while tracer.route_changes:
+                event = tracer.route_changes.popleft()
+                print(
+                    f"Route change {event.target_ipv4} #{event.hop}: "
+                    f"{event.previous_ipv4} -> {event.new_ipv4}"
+                    + (" (flapping)" if event.is_flap else "")
+                )
+            if tracer.n_dropped_replies:
+                print(
+                    f"Dropped {tracer.n_dropped_replies} replies, "
+                    "consider using more --workers."
+                )
+            print()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracer.stop()
+
+
+if __name__ == "__main__":
+    run()
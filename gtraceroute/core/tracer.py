@@ -1,17 +1,30 @@
 import asyncio
+from collections import deque
 from dataclasses import dataclass, field
-from gtraceroute.core.application.services import RouteHop
-from gtraceroute.core.transport.services import ICMPReplyWatcher, RequestDispatcher
+from typing import Callable, Deque
+from gtraceroute.core.application.sampling import SamplingPolicy
+from gtraceroute.core.application.services import RouteChangeEvent, RouteHop
+from gtraceroute.core.transport.services import (
+    ICMPReplyWatcher,
+    ReplyWatcher,
+    RequestDispatcher,
+)
 from gtraceroute.core.utils import await_or_cancel_on_event
 
 
 @dataclass
 class Tracer:
     dispatcher: RequestDispatcher = field(default_factory=lambda: RequestDispatcher())
-    reply_watcher: ICMPReplyWatcher = field(default_factory=lambda: ICMPReplyWatcher())
+    reply_watcher: ReplyWatcher = field(default_factory=lambda: ICMPReplyWatcher())
     stop: asyncio.Event = field(default_factory=lambda: asyncio.Event())
     _found_all_hops: asyncio.Event = field(default_factory=lambda: asyncio.Event())
     _hops: list[RouteHop] = field(default_factory=lambda: [])
+    route_changes: Deque[RouteChangeEvent] = field(
+        default_factory=lambda: deque([], maxlen=1000)
+    )
+    on_route_change: Callable[[RouteChangeEvent], None] | None = None
+    # without a policy every hop is measured again as soon as the last one returns
+    sampling_policy: SamplingPolicy | None = None
 
     @property
     def hops(self) -> list[RouteHop]:
@@ -26,11 +39,31 @@ class Tracer:
 
         return hops
 
-    async def hop_probing(self, target_ipv4: str, hop: int, timeout: float = 1):
-        route_hop = RouteHop(target_ipv4, hop, self._found_all_hops)
+    def record_route_change(self, event: RouteChangeEvent):
+        self.route_changes.append(event)
+        if self.on_route_change is not None:
+            self.on_route_change(event)
+
+    async def hop_probing(
+        self,
+        target_ipv4: str,
+        hop: int,
+        timeout: float = 1,
+        flow_id: int | None = None,
+    ):
+        route_hop = RouteHop(
+            target_ipv4,
+            hop,
+            self._found_all_hops,
+            flow_id=flow_id,
+            on_route_change=self.record_route_change,
+        )
         self._hops.append(route_hop)
         while not self.stop.is_set():
             await route_hop.measure(self.dispatcher, self.reply_watcher, timeout)
+            if self.sampling_policy is not None:
+                route_hop.probe_interval = self.sampling_policy.next_interval(route_hop)
+                await asyncio.sleep(route_hop.probe_interval)
 
     async def trace_route(
         self,
@@ -39,18 +72,24 @@ class Tracer:
         return_early: bool = False,
         measurement_timeout: float = 1,
         ttl_increment_delay: float = 0.5,
+        fetch_replies: bool = True,
+        flow_id: int | None = None,
     ) -> asyncio.Event:
         self._hops = []
+        self.route_changes.clear()
         self.stop.clear()
         self._found_all_hops.clear()
 
-        asyncio.create_task(self.reply_watcher.icmp_fetching(self.stop))
+        # tracers sharing a reply watcher only need one of them fetching
+        if fetch_replies:
+            asyncio.create_task(self.reply_watcher.icmp_fetching(self.stop))
         for hop in range(1, max_hops + 1):
             if self._found_all_hops.is_set():
                 break
             asyncio.create_task(
                 await_or_cancel_on_event(
-                    self.hop_probing(target_ipv4, hop, measurement_timeout), self.stop
+                    self.hop_probing(target_ipv4, hop, measurement_timeout, flow_id),
+                    self.stop,
                 )
             )
             await asyncio.sleep(ttl_increment_delay)
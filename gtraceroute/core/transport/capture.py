@@ -0,0 +1,91 @@
+import queue
+import struct
+import threading
+from typing import BinaryIO, Iterator
+
+from gtraceroute.core.utils import InvalidCaptureException
+
+# classic pcap with microsecond timestamps, see https://wiki.wireshark.org/Development/LibpcapFileFormat
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_VERSION = (2, 4)
+PCAP_SNAPLEN = 65535
+# packets start directly with their IPv4 header
+PCAP_LINKTYPE_RAW = 101
+
+PCAP_GLOBAL_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD_HEADER = struct.Struct("<IIII")
+
+
+# `record` only enqueues, the file is written from a background thread so that
+# capturing does not slow down the receive loop.
+class PcapWriter:
+    _queue: "queue.SimpleQueue[tuple[float, bytes] | None]"
+    _thread: threading.Thread
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(
+            PCAP_GLOBAL_HEADER.pack(
+                PCAP_MAGIC, *PCAP_VERSION, 0, 0, PCAP_SNAPLEN, PCAP_LINKTYPE_RAW
+            )
+        )
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_records, name="pcap-writer", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, ts: float, packet: bytes):
+        self._queue.put((ts, packet))
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write_records(self):
+        with self._file:
+            while (item := self._queue.get()) is not None:
+                ts, packet = item
+                ts_sec = int(ts)
+                ts_usec = int(round((ts - ts_sec) * 1_000_000))
+                if ts_usec == 1_000_000:
+                    ts_sec, ts_usec = ts_sec + 1, 0
+                self._file.write(
+                    PCAP_RECORD_HEADER.pack(ts_sec, ts_usec, len(packet), len(packet))
+                )
+                self._file.write(packet)
+
+                # only hit the disk once the backlog is drained
+                if self._queue.empty():
+                    self._file.flush()
+
+
+def read_pcap(path: str) -> Iterator[tuple[float, bytes]]:
+    with open(path, "rb") as file:
+        yield from _read_records(file)
+
+
+def _read_records(file: BinaryIO) -> Iterator[tuple[float, bytes]]:
+    global_header = file.read(PCAP_GLOBAL_HEADER.size)
+    if len(global_header) < PCAP_GLOBAL_HEADER.size:
+        raise InvalidCaptureException("Capture file is missing its pcap header.")
+
+    magic, *_, linktype = PCAP_GLOBAL_HEADER.unpack(global_header)
+    if magic != PCAP_MAGIC:
+        raise InvalidCaptureException(f"Unsupported pcap format. Got {magic=:#x}.")
+    if linktype != PCAP_LINKTYPE_RAW:
+        raise InvalidCaptureException(
+            f"Capture does not contain raw IPv4 packets. Got {linktype=}."
+        )
+
+    while len(record_header := file.read(PCAP_RECORD_HEADER.size)) > 0:
+        if len(record_header) < PCAP_RECORD_HEADER.size:
+            raise InvalidCaptureException("Capture file ends mid record.")
+        ts_sec, ts_usec, incl_len, _ = PCAP_RECORD_HEADER.unpack(record_header)
+        packet = file.read(incl_len)
+        if len(packet) < incl_len:
+            raise InvalidCaptureException("Capture file ends mid record.")
+        yield ts_sec + ts_usec / 1_000_000, packet
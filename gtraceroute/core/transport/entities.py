@@ -4,10 +4,18 @@ import struct
 from random import randbytes
 from dataclasses import dataclass, field
 
-from gtraceroute.core.utils import InvalidProbeReplyException
+from gtraceroute.core.utils import (
+    InvalidProbeReplyException,
+    InvalidProbeRequestException,
+)
 
 PROBE_BASE_PORT = 33434
 PROBE_UDP_PAYLOAD_SIZE = 8
+# outer IPv4 and ICMP headers followed by the quoted IPv4 and UDP headers
+PROBE_REPLY_MIN_SIZE = 56
+
+# fixed size encoding of an already parsed ProbeReply, see ProbeReply.to_record
+PROBE_REPLY_RECORD = struct.Struct(f">d4s4sBBBB4s4sBBHHHB{PROBE_UDP_PAYLOAD_SIZE}s")
 
 
 @dataclass
@@ -42,11 +50,12 @@ class ICMPHeader:
 class UDPHeader:
     source_port: int
     dst_port: int
+    length: int
 
     @staticmethod
     def from_bytes(header_bytes: bytes) -> "UDPHeader":
-        source_port, dst_port, _, _ = struct.unpack(">HHHH", header_bytes)
-        return UDPHeader(source_port, dst_port)
+        source_port, dst_port, length, _ = struct.unpack(">HHHH", header_bytes)
+        return UDPHeader(source_port, dst_port, length)
 
 
 @dataclass
@@ -61,25 +70,84 @@ class ProbeRequest:
 
     @property
     def port(self) -> int:
-        return PROBE_BASE_PORT + self.ttl
+        return PROBE_BASE_PORT + (self.ttl if self.flow_id is None else self.flow_id)
+
+    @property
+    def udp_length(self) -> int:
+        return 8 + len(self.udp_payload)
 
     udp_payload: bytes = field(
         default_factory=lambda: randbytes(PROBE_UDP_PAYLOAD_SIZE)
     )
     request_creation_ts: float = field(default_factory=lambda: time.time())
     dispatch_ts: float = field(default_factory=lambda: time.time())
+    # probes of the same flow share their ports, so ECMP routers hash them onto
+    # the same path. Instead of the port, the UDP length then encodes the ttl.
+    flow_id: int | None = None
+
+    def __post_init__(self):
+        if self.flow_id is not None:
+            self.udp_payload = self.udp_payload[:PROBE_UDP_PAYLOAD_SIZE].ljust(
+                PROBE_UDP_PAYLOAD_SIZE + self.ttl, b"\0"
+            )
 
     def update_dispatch_ts(self):
         self.dispatch_ts = time.time()
 
+    def to_bytes(self, source_port: int = 0) -> bytes:
+        # the kernel builds the real headers, this reconstructs them for captures
+        ipv4_header = struct.pack(
+            ">BBHHHBBH4s4s",
+            0x45,
+            0,
+            20 + self.udp_length,
+            0,
+            0,
+            self.ttl,
+            17,
+            0,
+            bytes(4),
+            self.ipv4_bytes,
+        )
+        udp_header = struct.pack(">HHHH", source_port, self.port, self.udp_length, 0)
+        return ipv4_header + udp_header + self.udp_payload
+
+    @staticmethod
+    def from_bytes(udp_packet: bytes, dispatch_ts: float) -> "ProbeRequest":
+        if len(udp_packet) < 28:
+            raise InvalidProbeRequestException(
+                f"Packet is too short to be a UDP probe. Got {len(udp_packet)=}."
+            )
+        ipv4_header = IPv4Header.from_bytes(udp_packet[:20])
+        if ipv4_header.protocol != 17:
+            raise InvalidProbeRequestException(
+                f"Packet is not a UDP probe. Got {ipv4_header.protocol=}."
+            )
+        udp_header = UDPHeader.from_bytes(udp_packet[20:28])
+        udp_payload = udp_packet[28:]
+        flow_id = (
+            None
+            if len(udp_payload) == PROBE_UDP_PAYLOAD_SIZE
+            else udp_header.dst_port - PROBE_BASE_PORT
+        )
+        return ProbeRequest(
+            ipv4_header.dst_ip,
+            ipv4_header.ttl,
+            udp_payload=udp_payload,
+            request_creation_ts=dispatch_ts,
+            dispatch_ts=dispatch_ts,
+            flow_id=flow_id,
+        )
+
     def matches(self, reply: "ProbeReply") -> bool:
-        if reply.ref_udp_payload == self.udp_payload:
+        if reply.ref_udp_payload == self.udp_payload[:PROBE_UDP_PAYLOAD_SIZE]:
             return True
         elif self.dispatch_ts > reply.receive_ts:
             return False
         elif (
             self.ipv4 == reply.ref_ipv4_header.dst_ip
             and self.port == reply.ref_udp_header.dst_port
+            and (self.flow_id is None or self.udp_length == reply.ref_udp_header.length)
         ):
             return True
         return False
@@ -102,6 +170,11 @@ class ProbeReply:
         payload_byte_size: int = PROBE_UDP_PAYLOAD_SIZE,
     ) -> "ProbeReply":
         receive_ts = receive_ts or time.time()
+        if len(icmp_packet) < PROBE_REPLY_MIN_SIZE:
+            raise InvalidProbeReplyException(
+                "ICMP packet is too short to quote a UDP probe. "
+                f"Got {len(icmp_packet)=}."
+            )
         ipv4_header = IPv4Header.from_bytes(icmp_packet[:20])
         if ipv4_header.protocol != 1:
             raise InvalidProbeReplyException(
@@ -127,3 +200,60 @@ class ProbeReply:
             ref_udp_header,
             ref_udp_payload,
         )
+
+    def to_record(self) -> bytes:
+        ref_udp_payload = self.ref_udp_payload or b""
+        return PROBE_REPLY_RECORD.pack(
+            self.receive_ts,
+            socket.inet_aton(self.ipv4_header.source_ip),
+            socket.inet_aton(self.ipv4_header.dst_ip),
+            self.ipv4_header.ttl,
+            self.ipv4_header.protocol,
+            self.icmp_header.type,
+            self.icmp_header.code,
+            socket.inet_aton(self.ref_ipv4_header.source_ip),
+            socket.inet_aton(self.ref_ipv4_header.dst_ip),
+            self.ref_ipv4_header.ttl,
+            self.ref_ipv4_header.protocol,
+            self.ref_udp_header.source_port,
+            self.ref_udp_header.dst_port,
+            self.ref_udp_header.length,
+            len(ref_udp_payload),
+            ref_udp_payload,
+        )
+
+    @staticmethod
+    def from_record(record: bytes) -> "ProbeReply":
+        (
+            receive_ts,
+            source_ip,
+            dst_ip,
+            ttl,
+            protocol,
+            icmp_type,
+            icmp_code,
+            ref_source_ip,
+            ref_dst_ip,
+            ref_ttl,
+            ref_protocol,
+            ref_source_port,
+            ref_dst_port,
+            ref_udp_length,
+            ref_udp_payload_size,
+            ref_udp_payload,
+        ) = PROBE_REPLY_RECORD.unpack_from(record)
+        return ProbeReply(
+            receive_ts,
+            IPv4Header(
+                socket.inet_ntoa(source_ip), socket.inet_ntoa(dst_ip), ttl, protocol
+            ),
+            ICMPHeader(icmp_type, icmp_code),
+            IPv4Header(
+                socket.inet_ntoa(ref_source_ip),
+                socket.inet_ntoa(ref_dst_ip),
+                ref_ttl,
+                ref_protocol,
+            ),
+            UDPHeader(ref_source_port, ref_dst_port, ref_udp_length),
+            ref_udp_payload[:ref_udp_payload_size] or None,
+        )
@@ -0,0 +1,71 @@
+import struct
+from multiprocessing import shared_memory
+
+# write, read and dropped counters, each only ever advanced by one side
+RING_HEADER = struct.Struct("=QQQ")
+
+
+# Single producer, single consumer ring of fixed size slots living in shared memory,
+# so one process can hand records to another without pickling or locking.
+class SharedRingBuffer:
+    capacity: int
+    slot_size: int
+    shm: shared_memory.SharedMemory
+    _buf: memoryview
+
+    def __init__(self, capacity: int, slot_size: int, name: str | None = None) -> None:
+        self.capacity = capacity
+        self.slot_size = slot_size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=RING_HEADER.size + capacity * slot_size
+            )
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        assert buf is not None
+        self._buf = buf
+        if name is None:
+            RING_HEADER.pack_into(self._buf, 0, 0, 0, 0)
+
+    def __reduce__(self):
+        # other processes attach to the same segment instead of copying it
+        return SharedRingBuffer, (self.capacity, self.slot_size, self.shm.name)
+
+    def __len__(self) -> int:
+        write_idx, read_idx, _ = RING_HEADER.unpack_from(self._buf, 0)
+        return write_idx - read_idx
+
+    @property
+    def n_dropped(self) -> int:
+        # records the producer could not put because the consumer fell behind
+        return RING_HEADER.unpack_from(self._buf, 0)[2]
+
+    def _slot_offset(self, idx: int) -> int:
+        return RING_HEADER.size + (idx % self.capacity) * self.slot_size
+
+    def put(self, record: bytes) -> bool:
+        write_idx, read_idx, n_dropped = RING_HEADER.unpack_from(self._buf, 0)
+        if write_idx - read_idx >= self.capacity:
+            struct.pack_into("=Q", self._buf, 16, n_dropped + 1)
+            return False
+        offset = self._slot_offset(write_idx)
+        self._buf[offset : offset + len(record)] = record
+        # publish the slot only after it has been written
+        struct.pack_into("=Q", self._buf, 0, write_idx + 1)
+        return True
+
+    def get(self) -> bytes | None:
+        write_idx, read_idx, _ = RING_HEADER.unpack_from(self._buf, 0)
+        if read_idx == write_idx:
+            return None
+        offset = self._slot_offset(read_idx)
+        record = bytes(self._buf[offset : offset + self.slot_size])
+        struct.pack_into("=Q", self._buf, 8, read_idx + 1)
+        return record
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -1,10 +1,18 @@
 from collections import deque
 import socket
 import asyncio
-from typing import Deque
+import time
+from typing import Deque, Protocol
 
+from gtraceroute.core.transport.capture import PcapWriter
 from gtraceroute.core.transport.entities import ProbeReply, ProbeRequest
-from gtraceroute.core.utils import async_recv, async_sendto, await_or_cancel_on_event
+from gtraceroute.core.transport.ring_buffer import SharedRingBuffer
+from gtraceroute.core.utils import (
+    InvalidProbeReplyException,
+    async_recv,
+    async_sendto,
+    await_or_cancel_on_event,
+)
 
 
 class RawSocketPermissionError(Exception):
@@ -42,19 +50,34 @@ class RawSocketPermissionError(Exception):
         )
 
 
+class ReplyWatcher(Protocol):
+    reply_buffer: Deque[ProbeReply]
+
+    async def icmp_fetching(self, stop_fetching: asyncio.Event):
+        ...
+
+
+def open_icmp_socket() -> socket.socket:
+    try:
+        return socket.socket(
+            socket.AF_INET, socket.SOCK_RAW, socket.getprotobyname("icmp")
+        )
+    except PermissionError:
+        raise RawSocketPermissionError()
+
+
 class ICMPReplyWatcher:
     icmp_socket: socket.socket
     reply_buffer: Deque[ProbeReply]
+    capture: PcapWriter | None
 
-    def __init__(self, buffer_size: int = 100) -> None:
+    def __init__(
+        self, buffer_size: int = 100, capture: PcapWriter | None = None
+    ) -> None:
         self.reply_buffer = deque([], maxlen=buffer_size)
+        self.capture = capture
 
-        try:
-            icmp_socket = socket.socket(
-                socket.AF_INET, socket.SOCK_RAW, socket.getprotobyname("icmp")
-            )
-        except PermissionError:
-            raise RawSocketPermissionError()
+        icmp_socket = open_icmp_socket()
         icmp_socket.setblocking(False)
         self.icmp_socket = icmp_socket
 
@@ -65,7 +88,14 @@ class ICMPReplyWatcher:
 
         if probe_bytes is None:
             return
-        reply = ProbeReply.from_bytes(probe_bytes)
+        receive_ts = time.time()
+        if self.capture is not None:
+            self.capture.record(receive_ts, probe_bytes)
+        # the socket sees all ICMP traffic of the host, e.g. echo replies
+        try:
+            reply = ProbeReply.from_bytes(probe_bytes, receive_ts)
+        except InvalidProbeReplyException:
+            return
         self.reply_buffer.append(reply)
 
     async def icmp_fetching(self, stop_fetching: asyncio.Event):
@@ -73,13 +103,41 @@ class ICMPReplyWatcher:
             await self.await_probe_reply(stop_fetching)
 
 
+# Drop-in for ICMPReplyWatcher in processes that do not own the raw socket. The
+# replies have already been parsed by the receiving process and arrive via `ring`.
+class SharedReplyWatcher:
+    ring: SharedRingBuffer
+    reply_buffer: Deque[ProbeReply]
+
+    def __init__(
+        self,
+        ring: SharedRingBuffer,
+        buffer_size: int = 100,
+        polling_interval: float = 0.01,
+    ) -> None:
+        self.ring = ring
+        self.reply_buffer = deque([], maxlen=buffer_size)
+        self.polling_interval = polling_interval
+
+    def drain_ring(self):
+        while (record := self.ring.get()) is not None:
+            self.reply_buffer.append(ProbeReply.from_record(record))
+
+    async def icmp_fetching(self, stop_fetching: asyncio.Event):
+        while not stop_fetching.is_set():
+            self.drain_ring()
+            await asyncio.sleep(self.polling_interval)
+
+
 class RequestDispatcher:
     udp_socket: socket.socket
+    capture: PcapWriter | None
 
-    def __init__(self) -> None:
+    def __init__(self, capture: PcapWriter | None = None) -> None:
         udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         udp_socket.setblocking(False)
         self.udp_socket = udp_socket
+        self.capture = capture
 
     async def dispatch(self, request: ProbeRequest):
         self.udp_socket.setsockopt(socket.SOL_IP, socket.IP_TTL, request.ttl)
@@ -87,3 +145,6 @@ class RequestDispatcher:
         await async_sendto(
             self.udp_socket, request.udp_payload, (request.ipv4, request.port)
         )
+        if self.capture is not None:
+            source_port = self.udp_socket.getsockname()[1]
+            self.capture.record(request.dispatch_ts, request.to_bytes(source_port))
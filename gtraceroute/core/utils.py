@@ -66,10 +66,26 @@ class InvalidProbeReplyException(Exception):
     pass
 
 
+class InvalidProbeRequestException(Exception):
+    pass
+
+
 class InvalidAddressException(Exception):
     pass
 
 
+class InvalidCaptureException(Exception):
+    pass
+
+
+class ShardProcessException(Exception):
+    pass
+
+
+class DaemonAlreadyRunningException(Exception):
+    pass
+
+
 @dataclass
 class RTTMonitor:
     ALPHA: float = 0.125
@@ -79,10 +95,12 @@ class RTTMonitor:
     exp_std: float | None = None
     no_obs: bool = True
     time_last_ob: float | None = None
+    n_obs: int = 0
 
     def observe(self, rtt: float):
         self.time_last_ob = time()
         self.no_obs = False
+        self.n_obs += 1
         self.buffer.append(rtt)
         self.exp_avg = (
             (1 - RTTMonitor.ALPHA) * self.exp_avg + RTTMonitor.ALPHA * rtt
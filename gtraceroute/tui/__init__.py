@@ -1,4 +1,14 @@
+from functools import cache
+
 from gtraceroute.core.transport.services import ICMPReplyWatcher, RequestDispatcher
 
-dispatcher = RequestDispatcher()
-icmp_watcher = ICMPReplyWatcher()
+
+# created on first use, attaching to a daemon must work without a raw socket
+@cache
+def get_dispatcher() -> RequestDispatcher:
+    return RequestDispatcher()
+
+
+@cache
+def get_icmp_watcher() -> ICMPReplyWatcher:
+    return ICMPReplyWatcher()
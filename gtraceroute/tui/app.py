@@ -1,7 +1,23 @@
+import argparse
+import asyncio
+
 from textual.app import App, ComposeResult
 from textual.containers import Container
 from textual.css.query import NoMatches
 from textual.widgets import Input, LoadingIndicator
+from gtraceroute.core.application.sampling import (
+    SamplingPolicy,
+    add_sampling_arguments,
+    sampling_policy_from_args,
+)
+from gtraceroute.core.daemon import (
+    DEFAULT_DAEMON_SOCKET,
+    TraceDaemon,
+    is_daemon_running,
+)
+from gtraceroute.core.transport.capture import PcapWriter
+from gtraceroute.core.utils import DaemonAlreadyRunningException
+from gtraceroute.tui import get_dispatcher, get_icmp_watcher
 from gtraceroute.tui.widgets.target_input import TargetInput
 from gtraceroute.tui.widgets.target_list import TargetList
 from gtraceroute.tui.widgets.tracer_widget import TracerWidget
@@ -10,6 +26,17 @@ from gtraceroute.tui.widgets.tracer_widget import TracerWidget
 class gTraceroute(App):
     CSS_PATH = "app.css"
 
+    def __init__(
+        self,
+        daemon_socket: str | None = None,
+        flow_id: int | None = None,
+        sampling_policy: SamplingPolicy | None = None,
+    ) -> None:
+        self.daemon_socket = daemon_socket
+        self.flow_id = flow_id
+        self.sampling_policy = sampling_policy
+        super().__init__()
+
     async def on_target_input_submitted(self, event: TargetInput.Submitted):
         try:
             self.query_one(TracerWidget).remove()
@@ -19,7 +46,13 @@ class gTraceroute(App):
             self.query_one("#tracer-widget-placeholder").remove()
         except NoMatches:
             pass
-        new_tracer_widget = TracerWidget(event.target_ipv4, id="tracer-widget")
+        new_tracer_widget = TracerWidget(
+            event.target_ipv4,
+            daemon_socket=self.daemon_socket,
+            flow_id=self.flow_id,
+            sampling_policy=self.sampling_policy,
+            id="tracer-widget",
+        )
         await self.query_one("#content-container", Container).mount(new_tracer_widget)
 
         sidebar = self.query_one(TargetList)
@@ -29,7 +62,13 @@ class gTraceroute(App):
         target_ipv4 = event.option.id
 
         self.query_one(TracerWidget).remove()
-        new_tracer_widget = TracerWidget(str(target_ipv4), id="tracer-widget")
+        new_tracer_widget = TracerWidget(
+            str(target_ipv4),
+            daemon_socket=self.daemon_socket,
+            flow_id=self.flow_id,
+            sampling_policy=self.sampling_policy,
+            id="tracer-widget",
+        )
         self.query_one("TargetInput Input", Input).value = str(target_ipv4)
         await self.query_one("#content-container", Container).mount(new_tracer_widget)
 
@@ -42,8 +81,69 @@ class gTraceroute(App):
 
 
 def run():
-    app = gTraceroute()
-    app.run()
+    parser = argparse.ArgumentParser(prog="gtraceroute")
+    parser.add_argument(
+        "--capture",
+        metavar="PCAP_FILE",
+        help="record all sent probes and received ICMP replies to a pcap file",
+    )
+    parser.add_argument(
+        "--paris",
+        action="store_true",
+        help="keep every probe on one flow so that all hops lie on the same ECMP path",
+    )
+    add_sampling_arguments(parser)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon",
+        nargs="?",
+        const=DEFAULT_DAEMON_SOCKET,
+        metavar="SOCKET",
+        help="run headless and serve traces to any number of clients",
+    )
+    mode.add_argument(
+        "--attach",
+        nargs="?",
+        const=DEFAULT_DAEMON_SOCKET,
+        metavar="SOCKET",
+        help="trace through a running daemon instead of probing directly",
+    )
+    args = parser.parse_args()
+
+    flow_id = 0 if args.paris else None
+    sampling_policy = sampling_policy_from_args(parser, args)
+    if args.attach is not None:
+        if args.capture or args.paris or args.adaptive:
+            parser.error(
+                "--capture, --paris and --adaptive have to be passed to the daemon."
+            )
+        if not asyncio.run(is_daemon_running(args.attach)):
+            parser.error(f"No daemon is listening on {args.attach}, start one first.")
+        gTraceroute(daemon_socket=args.attach).run()
+        return
+
+    capture = PcapWriter(args.capture) if args.capture else None
+    try:
+        if args.daemon is not None:
+            daemon = TraceDaemon(
+                args.daemon, flow_id=flow_id, sampling_policy=sampling_policy
+            )
+            daemon.dispatcher.capture = capture
+            daemon.reply_watcher.capture = capture
+            try:
+                asyncio.run(daemon.serve())
+            except DaemonAlreadyRunningException as exception:
+                parser.exit(1, f"{exception}\n")
+        else:
+            get_dispatcher().capture = capture
+            get_icmp_watcher().capture = capture
+            app = gTraceroute(flow_id=flow_id, sampling_policy=sampling_policy)
+            app.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if capture is not None:
+            capture.close()
 
 
 if __name__ == "__main__":
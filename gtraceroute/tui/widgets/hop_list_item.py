@@ -32,8 +32,10 @@ class HopListItem(Widget):
         self.hop_statistic.update(HopListItem.statistic_str_from_hop(new_hop))
         self.sparkline.update(new_hop)
         time_last_ob = new_hop.rtt.time_last_ob or 0
+        # adaptively sampled hops are expected to be quiet for a while
+        timeout = HopListItem.CONNECTION_TIMEOUT_S + new_hop.probe_interval
         self.set_class(
-            is_timeout := time() - time_last_ob > HopListItem.CONNECTION_TIMEOUT_S,
+            is_timeout := time() - time_last_ob > timeout,
             "warn-state",
         )
         self.border_title = "Package Loss" if is_timeout else None
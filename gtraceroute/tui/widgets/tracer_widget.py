@@ -1,14 +1,19 @@
+from rich.markup import escape
 from textual import work
 from textual.app import ComposeResult
 from textual.widget import Widget
+from textual.widgets import Static
+from gtraceroute.core.application.sampling import SamplingPolicy
+from gtraceroute.core.daemon import RemoteTracer
 from gtraceroute.core.tracer import Tracer
+from gtraceroute.core.utils import InvalidAddressException
 from gtraceroute.tui.widgets.hop_list import HopList
-from gtraceroute.tui import dispatcher, icmp_watcher
+from gtraceroute.tui import get_dispatcher, get_icmp_watcher
 
 
 class TracerWidget(Widget):
     hop_list: HopList
-    tracer: Tracer
+    tracer: Tracer | RemoteTracer
 
     def __init__(
         self,
@@ -16,6 +21,9 @@ class TracerWidget(Widget):
         polling_rate: float = 0.3,
         measurement_timeout: float = 1,
         ttl_increment_delay: float = 0.5,
+        daemon_socket: str | None = None,
+        flow_id: int | None = None,
+        sampling_policy: SamplingPolicy | None = None,
         *children: Widget,
         name: str | None = None,
         id: str | None = None,
@@ -26,7 +34,13 @@ class TracerWidget(Widget):
             *children, name=name, id=id, classes=classes, disabled=disabled
         )
         self.start_tracing(
-            target_ipv4, polling_rate, measurement_timeout, ttl_increment_delay
+            target_ipv4,
+            polling_rate,
+            measurement_timeout,
+            ttl_increment_delay,
+            daemon_socket,
+            flow_id,
+            sampling_policy,
         )
 
     @work(exclusive=True)
@@ -36,14 +50,35 @@ class TracerWidget(Widget):
         polling_rate: float,
         measurement_timeout: float,
         ttl_increment_delay: float,
+        daemon_socket: str | None,
+        flow_id: int | None,
+        sampling_policy: SamplingPolicy | None,
     ):
-        self.tracer = Tracer(dispatcher, icmp_watcher)
+        if daemon_socket is not None:
+            self.tracer = RemoteTracer(daemon_socket)
+            self.polling_timer = self.set_interval(
+                polling_rate, self.poll_tracing_status
+            )
+            try:
+                await self.tracer.trace_route(target_ipv4)
+            except (InvalidAddressException, OSError) as exception:
+                # e.g. the daemon went away or rejected the target
+                self.polling_timer.stop()
+                await self.mount(
+                    Static(f"[red]Daemon error:[/red] {escape(str(exception))}")
+                )
+            return
+
+        self.tracer = Tracer(
+            get_dispatcher(), get_icmp_watcher(), sampling_policy=sampling_policy
+        )
         self.polling_timer = self.set_interval(polling_rate, self.poll_tracing_status)
         await self.tracer.trace_route(
             target_ipv4,
             return_early=False,
             measurement_timeout=measurement_timeout,
             ttl_increment_delay=ttl_increment_delay,
+            flow_id=flow_id,
         )
 
     async def poll_tracing_status(self):
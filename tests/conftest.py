@@ -0,0 +1,32 @@
+import socket
+import struct
+from typing import Callable
+
+import pytest
+
+from gtraceroute.core.transport.entities import ProbeRequest
+
+
+def build_icmp_reply(request: ProbeRequest, quoted_payload_size: int = 0) -> bytes:
+    # a time exceeded message from 10.0.0.1, quoting the headers of `request`
+    quoted = request.to_bytes(source_port=50000)[: 28 + quoted_payload_size]
+    ipv4_header = struct.pack(
+        ">BBHHHBBH4s4s",
+        0x45,
+        0,
+        28 + len(quoted),
+        0,
+        0,
+        64,
+        1,
+        0,
+        socket.inet_aton("10.0.0.1"),
+        socket.inet_aton("192.168.0.2"),
+    )
+    icmp_header = struct.pack(">BBHI", 11, 0, 0, 0)
+    return ipv4_header + icmp_header + quoted
+
+
+@pytest.fixture
+def icmp_reply_bytes() -> Callable[..., bytes]:
+    return build_icmp_reply
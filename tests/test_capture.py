@@ -0,0 +1,97 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from gtraceroute.core.application.replay import replay_capture
+from gtraceroute.core.transport.capture import (
+    PCAP_GLOBAL_HEADER,
+    PCAP_MAGIC,
+    PcapWriter,
+    read_pcap,
+)
+from gtraceroute.core.transport.entities import ProbeReply, ProbeRequest
+from gtraceroute.core.utils import (
+    InvalidCaptureException,
+    InvalidProbeReplyException,
+)
+
+
+def write_capture(path: Path, packets: list[tuple[float, bytes]]):
+    writer = PcapWriter(str(path))
+    for ts, packet in packets:
+        writer.record(ts, packet)
+    writer.close()
+
+
+@pytest.mark.parametrize("flow_id", [None, 2])
+def test_request_bytes_round_trip(flow_id: int | None):
+    request = ProbeRequest("1.2.3.4", 5, flow_id=flow_id)
+    parsed = ProbeRequest.from_bytes(request.to_bytes(), request.dispatch_ts)
+    assert (parsed.ipv4, parsed.ttl, parsed.flow_id) == ("1.2.3.4", 5, flow_id)
+    assert parsed.udp_payload == request.udp_payload
+
+
+def test_short_reply_is_invalid(icmp_reply_bytes):
+    echo_reply = icmp_reply_bytes(ProbeRequest("1.2.3.4", 3))[:28]
+    with pytest.raises(InvalidProbeReplyException):
+        ProbeReply.from_bytes(echo_reply)
+
+
+def test_read_pcap_returns_recorded_packets(tmp_path: Path):
+    packets = [(1000.25, b"\x45" * 28), (1000.999_999_9, b"\x45" * 40)]
+    write_capture(tmp_path / "probes.pcap", packets)
+
+    recorded = list(read_pcap(str(tmp_path / "probes.pcap")))
+    assert [packet for _, packet in recorded] == [packet for _, packet in packets]
+    assert recorded[0][0] == pytest.approx(1000.25)
+    # microseconds that round up carry over into the seconds
+    assert recorded[1][0] == pytest.approx(1001)
+
+
+def test_read_pcap_rejects_truncated_records(tmp_path: Path):
+    path = tmp_path / "probes.pcap"
+    write_capture(path, [(1000, b"\x45" * 28), (1001, b"\x45" * 28)])
+    path.write_bytes(path.read_bytes()[:-10])
+
+    records = read_pcap(str(path))
+    next(records)
+    with pytest.raises(InvalidCaptureException):
+        next(records)
+
+
+def test_read_pcap_rejects_missing_header(tmp_path: Path):
+    path = tmp_path / "probes.pcap"
+    path.write_bytes(b"\xd4\xc3")
+    with pytest.raises(InvalidCaptureException):
+        list(read_pcap(str(path)))
+
+
+def test_read_pcap_rejects_other_linktypes(tmp_path: Path):
+    # an ethernet capture, e.g. from tcpdump
+    path = tmp_path / "probes.pcap"
+    path.write_bytes(PCAP_GLOBAL_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, 65535, 1))
+    with pytest.raises(InvalidCaptureException):
+        list(read_pcap(str(path)))
+
+
+def test_replay_matches_recorded_replies(tmp_path: Path, icmp_reply_bytes):
+    requests = [ProbeRequest("1.2.3.4", ttl, dispatch_ts=1000 + ttl) for ttl in (1, 2)]
+    requests.append(ProbeRequest("1.2.3.4", 3, flow_id=7, dispatch_ts=1003))
+    # no reply within the measurement timeout
+    lost_request = ProbeRequest("1.2.3.4", 4, dispatch_ts=1004)
+    late_reply = icmp_reply_bytes(lost_request)
+    # too short to be a probe reply, like an echo reply
+    echo_reply = icmp_reply_bytes(lost_request)[:28]
+
+    packets = [(request.dispatch_ts, request.to_bytes()) for request in requests]
+    packets.append((lost_request.dispatch_ts, lost_request.to_bytes()))
+    packets += [
+        (request.dispatch_ts + 0.01, icmp_reply_bytes(request)) for request in requests
+    ]
+    packets += [(1004.02, echo_reply), (1006, late_reply)]
+    write_capture(tmp_path / "probes.pcap", packets)
+
+    stats = asyncio.run(replay_capture(str(tmp_path / "probes.pcap")))
+    assert (stats.n_requests, stats.n_replies, stats.n_matched) == (4, 4, 3)
+    assert stats.n_invalid == 1
@@ -0,0 +1,63 @@
+from dataclasses import asdict, replace
+
+from gtraceroute.core.application.services import HopSnapshot
+from gtraceroute.core.daemon import RemoteTracer, with_new_rtt_samples
+
+
+def hop_snapshot(hop_ipv4: str, rtt_history: list[float]) -> HopSnapshot:
+    return HopSnapshot(
+        "1.2.3.4",
+        3,
+        hop_ipv4,
+        rtt_avg=rtt_history[-1],
+        rtt_std=0,
+        time_last_ob=1000,
+        n_successful_measurements=len(rtt_history),
+        n_failed_measurements=0,
+        rtt_history=rtt_history,
+        n_rtt_samples=len(rtt_history),
+    )
+
+
+def update(*hops: HopSnapshot) -> dict:
+    return {
+        "target_ipv4": "1.2.3.4",
+        "hops": [asdict(hop) for hop in hops],
+        "removed": [],
+    }
+
+
+def test_only_new_rtt_samples_are_sent():
+    sent = hop_snapshot("10.0.0.1", [1, 2, 3])
+    hop = hop_snapshot("10.0.0.1", [1, 2, 3, 4, 5])
+    assert with_new_rtt_samples(hop, None).rtt_history == [1, 2, 3, 4, 5]
+    assert with_new_rtt_samples(hop, sent).rtt_history == [4, 5]
+    assert with_new_rtt_samples(sent, sent).rtt_history == []
+
+
+def test_full_history_once_the_buffer_wrapped():
+    sent = hop_snapshot("10.0.0.1", [1, 2, 3])
+    hop = replace(sent, rtt_history=[4, 5, 6], n_rtt_samples=8)
+    assert with_new_rtt_samples(hop, sent).rtt_history == [4, 5, 6]
+
+
+def test_new_responder_sends_its_full_history():
+    sent = hop_snapshot("10.0.0.1", [1, 2, 3])
+    hop = hop_snapshot("10.0.0.2", [7, 8])
+    assert with_new_rtt_samples(hop, sent).rtt_history == [7, 8]
+
+
+def test_remote_tracer_appends_new_rtt_samples():
+    tracer = RemoteTracer()
+    first = hop_snapshot("10.0.0.1", [1, 2, 3])
+    second = hop_snapshot("10.0.0.1", [1, 2, 3, 4])
+
+    tracer.apply_update(update(first))
+    tracer.apply_update(update(with_new_rtt_samples(second, first)))
+    [hop] = tracer.hops
+    assert list(hop.rtt.buffer) == [1, 2, 3, 4]
+    assert hop.rtt.exp_avg == 4
+
+    tracer.apply_update(update(hop_snapshot("10.0.0.2", [7])))
+    [hop] = tracer.hops
+    assert (hop.hop_ipv4, list(hop.rtt.buffer)) == ("10.0.0.2", [7])
@@ -0,0 +1,36 @@
+from gtraceroute.core.transport.entities import (
+    PROBE_BASE_PORT,
+    ProbeReply,
+    ProbeRequest,
+)
+
+
+def test_flow_stable_probes_share_their_port():
+    requests = [ProbeRequest("1.2.3.4", ttl, flow_id=7) for ttl in range(1, 5)]
+    assert {request.port for request in requests} == {PROBE_BASE_PORT + 7}
+    assert len({request.udp_length for request in requests}) == len(requests)
+
+
+def test_flow_stable_match_uses_udp_length(icmp_reply_bytes):
+    request = ProbeRequest("1.2.3.4", 3, flow_id=7)
+    other_ttl = ProbeRequest("1.2.3.4", 4, flow_id=7)
+    reply = ProbeReply.from_bytes(icmp_reply_bytes(request), request.dispatch_ts)
+
+    assert reply.ref_udp_payload is None
+    assert request.matches(reply)
+    assert not other_ttl.matches(reply)
+
+
+def test_flow_stable_match_on_quoted_payload(icmp_reply_bytes):
+    request = ProbeRequest("1.2.3.4", 3, flow_id=7)
+    reply = ProbeReply.from_bytes(
+        icmp_reply_bytes(request, quoted_payload_size=8), request.dispatch_ts
+    )
+    assert request.matches(reply)
+
+
+def test_classic_match_ignores_udp_length(icmp_reply_bytes):
+    request = ProbeRequest("1.2.3.4", 3)
+    reply = ProbeReply.from_bytes(icmp_reply_bytes(request), request.dispatch_ts)
+    assert request.matches(reply)
+    assert not ProbeRequest("1.2.3.4", 4).matches(reply)
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from gtraceroute.core.application.multipath import MultipathDiscoverer, probes_needed
+from gtraceroute.core.transport.entities import (
+    ICMPHeader,
+    IPv4Header,
+    ProbeReply,
+    UDPHeader,
+)
+
+
+def test_probes_needed_matches_mda_table():
+    # Augustin et al., "Multipath tracing with Paris traceroute", alpha = 0.05
+    assert [probes_needed(k) for k in range(10)] == [
+        1,
+        6,
+        11,
+        16,
+        21,
+        27,
+        33,
+        38,
+        44,
+        51,
+    ]
+
+
+def test_probes_needed_grows_with_confidence():
+    assert probes_needed(1, 0.99) > probes_needed(1, 0.95)
+
+
+class StubDiscoverer(MultipathDiscoverer):
+    # answers every flow from `next_hops[flow_id % len(next_hops)]`
+    def __init__(
+        self, next_hops: list[str], lost_flows: frozenset[int] = frozenset()
+    ) -> None:
+        super().__init__(dispatcher=None, reply_watcher=None)  # type: ignore[arg-type]
+        self.next_hops = next_hops
+        self.lost_flows = lost_flows
+        self.probed: list[tuple[int, int]] = []
+
+    async def probe_flow(
+        self, target_ipv4: str, ttl: int, flow_id: int, timeout: float
+    ) -> ProbeReply | None:
+        self.probed.append((ttl, flow_id))
+        if flow_id in self.lost_flows:
+            return None
+        source_ip = self.next_hops[flow_id % len(self.next_hops)]
+        return ProbeReply(
+            0,
+            IPv4Header(source_ip, "192.168.0.2", 64, 1),
+            ICMPHeader(11, 0),
+            IPv4Header("192.168.0.2", target_ipv4, 1, 17),
+            UDPHeader(50000, 33434, 16),
+            None,
+        )
+
+
+def discover(discoverer: MultipathDiscoverer, **kwargs):
+    return asyncio.run(
+        discoverer.discover("9.9.9.9", max_hops=1, fetch_replies=False, **kwargs)
+    )
+
+
+@pytest.mark.parametrize("n_next_hops", [1, 2, 3])
+def test_discover_stops_once_next_hops_are_ruled_out(n_next_hops: int):
+    next_hops = [f"10.0.0.{i}" for i in range(n_next_hops)]
+    topology = discover(StubDiscoverer(next_hops))
+    assert topology.interfaces(1) == set(next_hops)
+    assert topology.n_probes == probes_needed(n_next_hops)
+
+
+def test_discover_does_not_count_lost_flows_as_answered():
+    topology = discover(
+        StubDiscoverer(["10.0.0.0", "10.0.0.1"], lost_flows=frozenset({0}))
+    )
+    assert topology.interfaces(1) == {"10.0.0.0", "10.0.0.1"}
+    assert topology.n_probes == probes_needed(2) + 1
+
+
+def test_discover_gives_up_on_silent_ttl():
+    discoverer = StubDiscoverer(["10.0.0.0"], lost_flows=frozenset(range(128)))
+    topology = discover(discoverer, max_lost_flows=3)
+    assert topology.interfaces(1) == set()
+    assert topology.n_probes == 3
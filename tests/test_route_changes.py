@@ -0,0 +1,92 @@
+import asyncio
+
+from gtraceroute.core.application.services import (
+    ResponderSet,
+    RouteChangeEvent,
+    RouteHop,
+)
+
+
+def route_hop(events: list[RouteChangeEvent]) -> RouteHop:
+    return RouteHop("1.2.3.4", 3, asyncio.Event(), on_route_change=events.append)
+
+
+def measure(hop: RouteHop, responder_ipv4: str, rtt: float, ts: float = 1000):
+    hop.update_responder(responder_ipv4, ts)
+    hop.rtt.observe(rtt)
+
+
+def test_responder_set_forgets_responders_outside_its_window():
+    responders = ResponderSet(window=3)
+    for ipv4 in ["A", "A", "B", "C"]:
+        responders.observe(ipv4)
+    assert responders.counts == {"A": 1, "B": 1, "C": 1}
+
+    responders.observe("C")
+    assert responders.counts == {"B": 1, "C": 2}
+    assert responders.current == "C"
+
+
+def test_first_responder_is_no_route_change():
+    responders = ResponderSet()
+    assert responders.observe("A") is None
+    assert responders.observe("A") is None
+    assert responders.observe("B") == ("A", False)
+
+
+def test_returning_responder_is_a_flap_only_within_the_window():
+    responders = ResponderSet(window=3)
+    responders.observe("A")
+    responders.observe("B")
+    assert responders.observe("A") == ("B", True)
+
+    responders.observe("B")
+    responders.observe("B")
+    responders.observe("B")
+    assert responders.observe("A") == ("B", False)
+
+
+def test_route_changes_are_reported_with_flaps():
+    events: list[RouteChangeEvent] = []
+    hop = route_hop(events)
+    sequence = ["A"] * 5 + ["B"] * 3 + ["A", "C"]
+    for ts, ipv4 in enumerate(sequence):
+        measure(hop, ipv4, 10, ts=ts)
+
+    assert [(e.previous_ipv4, e.new_ipv4, e.is_flap) for e in events] == [
+        ("A", "B", False),
+        ("B", "A", True),
+        ("A", "C", False),
+    ]
+    assert [e.ts for e in events] == [5, 8, 9]
+    assert all((e.target_ipv4, e.hop) == ("1.2.3.4", 3) for e in events)
+    assert hop.last_route_change_ts == 9
+    assert hop.hop_ipv4 == "C"
+
+
+def test_rtt_statistics_are_kept_per_responder():
+    hop = route_hop([])
+    for _ in range(5):
+        measure(hop, "A", 10)
+    for _ in range(3):
+        measure(hop, "B", 50)
+    assert hop.rtt.exp_avg == 50
+
+    measure(hop, "A", 10)
+    assert hop.rtt.exp_avg == 10
+    assert hop.rtt_by_responder["B"].exp_avg == 50
+    assert hop.rtt_by_responder["A"] is hop.rtt
+
+
+def test_stale_responders_lose_their_rtt_statistics():
+    hop = route_hop([])
+    hop.responders = ResponderSet(window=3)
+    measure(hop, "A", 10)
+    for _ in range(3):
+        measure(hop, "B", 50)
+
+    # A left the window, so switching to C drops its statistics
+    measure(hop, "C", 30)
+    assert set(hop.rtt_by_responder) == {"B", "C"}
+    measure(hop, "A", 20)
+    assert hop.rtt.exp_avg == 20
@@ -0,0 +1,42 @@
+import asyncio
+
+from gtraceroute.core.application.sampling import SamplingPolicy
+from gtraceroute.core.application.services import RouteHop
+
+
+def route_hop(outcomes: list[bool], rtts: list[float]) -> RouteHop:
+    hop = RouteHop("9.9.9.9", 3, asyncio.Event())
+    hop.recent_outcomes.extend(outcomes)
+    for rtt in rtts:
+        hop.rtt.observe(rtt)
+    return hop
+
+
+def back_off(policy: SamplingPolicy, hop: RouteHop, n_measurements: int) -> float:
+    for _ in range(n_measurements):
+        hop.probe_interval = policy.next_interval(hop)
+    return hop.probe_interval
+
+
+def test_quiet_hop_backs_off_to_max_interval():
+    policy = SamplingPolicy(max_interval=7)
+    hop = route_hop([True] * 10, [10.0] * 10)
+    assert back_off(policy, hop, 10) == 7
+
+
+def test_silent_hop_backs_off_to_max_interval():
+    policy = SamplingPolicy(max_interval=7)
+    hop = route_hop([False] * 10, [])
+    assert back_off(policy, hop, 10) == 7
+
+
+def test_lossy_hop_is_probed_at_min_interval():
+    policy = SamplingPolicy(min_interval=0.1)
+    hop = route_hop([True] * 9 + [False], [10.0] * 9)
+    assert back_off(policy, hop, 10) == 0.1
+
+
+def test_noisy_hop_is_probed_at_min_interval():
+    policy = SamplingPolicy(min_interval=0.1)
+    hop = route_hop([True] * 10, [10.0, 40.0] * 5)
+    assert back_off(policy, hop, 10) == 0.1
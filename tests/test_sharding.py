@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+
+from gtraceroute.core.transport.entities import (
+    PROBE_REPLY_RECORD,
+    ProbeReply,
+    ProbeRequest,
+)
+from gtraceroute.core.transport.ring_buffer import SharedRingBuffer
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRingBuffer(capacity=4, slot_size=8)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+@pytest.mark.parametrize("quoted_payload_size", [0, 4, 8])
+def test_reply_record_round_trip(icmp_reply_bytes, quoted_payload_size: int):
+    request = ProbeRequest("1.2.3.4", 3, flow_id=7)
+    reply = ProbeReply.from_bytes(
+        icmp_reply_bytes(request, quoted_payload_size), 1234.5
+    )
+    assert len(reply.to_record()) == PROBE_REPLY_RECORD.size
+    assert ProbeReply.from_record(reply.to_record()) == reply
+
+
+def test_ring_buffer_is_fifo_across_wrap_around(ring: SharedRingBuffer):
+    for lap in range(3):
+        records = [bytes([lap, i]) * 4 for i in range(4)]
+        for record in records:
+            assert ring.put(record)
+        assert len(ring) == 4
+        assert [ring.get() for _ in records] == records
+        assert ring.get() is None
+
+
+def test_ring_buffer_counts_dropped_records(ring: SharedRingBuffer):
+    for i in range(6):
+        ring.put(bytes([i]) * 8)
+    assert len(ring) == 4
+    assert ring.n_dropped == 2
+    assert ring.get() == bytes([0]) * 8
+
+
+def test_unpickled_ring_buffer_shares_its_slots(ring: SharedRingBuffer):
+    consumer = pickle.loads(pickle.dumps(ring))
+    try:
+        ring.put(b"\x01" * 8)
+        ring.put(b"\x02" * 8)
+        ring.put(b"\x03" * 8)
+        ring.put(b"\x04" * 8)
+        ring.put(b"\x05" * 8)
+        assert consumer.get() == b"\x01" * 8
+        assert consumer.n_dropped == 1
+        assert len(ring) == 3
+    finally:
+        consumer.close()